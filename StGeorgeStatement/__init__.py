@@ -0,0 +1,7 @@
+"""
+Parser for St George Bank PDF statements.
+
+Importing this package is deliberately cheap: PyPDF2 is only imported when a
+statement is actually parsed.
+"""
+from .statement import getStatement, getTransactions
@@ -0,0 +1,3 @@
+from .statement import main
+
+main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Regression and throughput gate for the statement parser.
+
+Parses every PDF under a corpus directory in parallel, and either records the
+canonical transaction output and per-file timings as a baseline, or compares
+against a previously recorded baseline. Output differences and timings slower
+than the baseline by more than the tolerance are reported, and cause a
+non-zero exit status.
+"""
+
+import json
+import os
+import sys
+import time
+
+from .statement import getTransactions, resetParseState
+
+
+def canonicalTransaction(transaction):
+    canonical = {"type": transaction.__class__.__name__}
+    canonical.update(vars(transaction))
+    return canonical
+
+
+def warmUpWorker():
+    # getTransactions imports PyPDF2 lazily; do it up front so the first
+    # statement each worker parses isn't charged for the import.
+    try:
+        import PyPDF2
+    except ImportError:
+        # Reported per statement by parseStatement instead
+        pass
+
+
+def parseStatement(filename, repeat=1):
+    """
+    Returns (output, seconds) for a single statement, where output is either
+    the list of canonical transactions, or a string describing the failure.
+    The statement is parsed repeat times, and the fastest time is kept, as
+    other workers are competing for the same CPUs.
+    """
+    bestSeconds = None
+    for _ in range(repeat):
+        resetParseState()
+        start = time.perf_counter()
+        try:
+            output = [canonicalTransaction(t)
+                      for t in getTransactions(filename)]
+        except Exception as e:
+            output = "{}: {}".format(e.__class__.__name__, e)
+        seconds = time.perf_counter() - start
+        if bestSeconds is None or seconds < bestSeconds:
+            bestSeconds = seconds
+    return output, bestSeconds
+
+
+def findStatements(corpus):
+    statements = []
+    for dirPath, _, fileNames in os.walk(corpus):
+        for fileName in fileNames:
+            if fileName.lower().endswith(".pdf"):
+                statements.append(os.path.relpath(
+                    os.path.join(dirPath, fileName), corpus).replace(
+                        os.sep, "/"))
+    return sorted(statements)
+
+
+def runCorpus(corpus, jobs=None, repeat=1):
+    from concurrent.futures import ProcessPoolExecutor
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    statements = findStatements(corpus)
+    paths = [os.path.join(corpus, s) for s in statements]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=warmUpWorker) as executor:
+        results = list(executor.map(parseStatement, paths,
+                                    [repeat] * len(paths)))
+    wallSeconds = time.perf_counter() - start
+
+    files = {}
+    for statement, (output, seconds) in zip(statements, results):
+        files[statement] = {"output": output, "seconds": seconds}
+    return {"files": files, "wallSeconds": wallSeconds, "jobs": jobs}
+
+
+def failedStatements(run):
+    return sorted(statement for statement, result in run["files"].items()
+                  if isinstance(result["output"], str))
+
+
+def describeOutputDiff(statement, expected, actual):
+    import difflib
+
+    def lines(output):
+        if isinstance(output, str):
+            return [output]
+        return [json.dumps(t, sort_keys=True) for t in output]
+
+    return "\n".join(
+        difflib.unified_diff(lines(expected), lines(actual),
+                             "baseline/{}".format(statement),
+                             "current/{}".format(statement),
+                             lineterm=""))
+
+
+def compareRuns(baseline, current, tolerance, minSeconds):
+    """
+    Returns a list of human-readable regressions of current against baseline.
+    Timings below minSeconds in both runs are too noisy to judge, and are not
+    reported.
+    """
+    problems = []
+    baseFiles = baseline["files"]
+    currFiles = current["files"]
+
+    for statement in sorted(set(baseFiles) - set(currFiles)):
+        problems.append("Missing from corpus: {}".format(statement))
+    for statement in sorted(set(currFiles) - set(baseFiles)):
+        problems.append("Not in baseline: {}".format(statement))
+
+    baseTotal = 0.0
+    currTotal = 0.0
+    for statement in sorted(set(baseFiles) & set(currFiles)):
+        base = baseFiles[statement]
+        curr = currFiles[statement]
+        if base["output"] != curr["output"]:
+            problems.append("Output changed: {}\n{}".format(
+                statement, describeOutputDiff(statement, base["output"],
+                                              curr["output"])))
+
+        baseTotal += base["seconds"]
+        currTotal += curr["seconds"]
+        if max(base["seconds"], curr["seconds"]) < minSeconds:
+            continue
+        if curr["seconds"] > base["seconds"] * (1 + tolerance):
+            problems.append("Latency regression: {}: {:.4f}s -> {:.4f}s".format(
+                statement, base["seconds"], curr["seconds"]))
+
+    if max(baseTotal, currTotal) >= minSeconds and currTotal > baseTotal * (
+            1 + tolerance):
+        problems.append(
+            "Throughput regression: total parse time {:.4f}s -> {:.4f}s".format(
+                baseTotal, currTotal))
+
+    # Wall-clock time covers the whole parallel run, so compare statements
+    # per second to allow for the corpus growing or shrinking. It's only
+    # comparable if the same number of workers were used.
+    baseWall = baseline["wallSeconds"]
+    currWall = current["wallSeconds"]
+    sameJobs = baseline.get("jobs") == current.get("jobs")
+    if sameJobs and baseFiles and currFiles and max(baseWall,
+                                                    currWall) >= minSeconds:
+        baseRate = len(baseFiles) / baseWall
+        currRate = len(currFiles) / currWall
+        if baseRate > currRate * (1 + tolerance):
+            problems.append(
+                "Throughput regression: {:.2f} -> {:.2f} statements/s".format(
+                    baseRate, currRate))
+
+    return problems
+
+
+def positiveInt(text):
+    import argparse
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus", help="directory of statement PDFs")
+    parser.add_argument("baseline", help="baseline JSON file")
+    parser.add_argument("--update", action="store_true",
+                        help="record a new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed fractional slowdown (default: 0.2)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="ignore timings below this "
+                        "(default: 0.05)")
+    parser.add_argument("--jobs", type=positiveInt, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--repeat", type=positiveInt, default=1,
+                        help="parse each statement this many times, keeping "
+                        "the fastest (default: 1)")
+    parser.add_argument("--allow-failures", action="store_true",
+                        help="allow --update to record statements that "
+                        "failed to parse")
+    args = parser.parse_args(argv)
+
+    if not args.update and not os.path.exists(args.baseline):
+        print("No baseline {}; record one with --update".format(args.baseline),
+              file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.corpus) or not findStatements(args.corpus):
+        print("No statements found in {}".format(args.corpus),
+              file=sys.stderr)
+        return 2
+
+    current = runCorpus(args.corpus, args.jobs, args.repeat)
+    print("Parsed {} statements in {:.4f}s".format(len(current["files"]),
+                                                   current["wallSeconds"]))
+
+    if args.update:
+        failed = failedStatements(current)
+        if failed and not args.allow_failures:
+            print("Not recording a baseline with failed statements; use "
+                  "--allow-failures to record them anyway:", file=sys.stderr)
+            print("\n".join("{}: {}".format(s, current["files"][s]["output"])
+                            for s in failed), file=sys.stderr)
+            return 2
+        with open(args.baseline, "w") as baselineFile:
+            json.dump(current, baselineFile, indent=1, sort_keys=True)
+        print("Wrote baseline {}".format(args.baseline))
+        return 0
+
+    with open(args.baseline) as baselineFile:
+        baseline = json.load(baselineFile)
+
+    problems = compareRuns(baseline, current, args.tolerance, args.min_seconds)
+    if problems:
+        print("\n".join(problems))
+        print("{} regressions against {}".format(len(problems), args.baseline))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
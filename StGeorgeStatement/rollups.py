@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained spending rollups over parsed transactions.
+
+Each ingested transaction is added to running totals keyed by month,
+transaction class, detail, location and month/class, so later queries are
+dictionary lookups rather than re-parsing every statement.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+from .corpus import canonicalTransaction
+from .statement import (centsToCurrency, currencyToCents, getStatement,
+                        knownForeignCurrencies, resetParseState)
+
+monthNames = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP",
+              "OCT", "NOV", "DEC")
+
+# The year is optional on transaction dates; if missing, it comes from the
+# statement period.
+numericDate = re.compile(r"^\d{1,2}/(\d{1,2})(?:/(\d{2}|\d{4}))?$")
+namedDate = re.compile(r"^\d{1,2} ([A-Za-z]{3})[A-Za-z]*(?: (\d{2}|\d{4}))?$")
+periodDate = re.compile(
+    r"\b\d{1,2}(?:/(\d{1,2})/| ([A-Za-z]{3})[A-Za-z]* )(\d{4}|\d{2})\b")
+foreignAmount = re.compile(r"^([A-Z]{3})\s*(\d[\d,]*(?:\.\d+)?)")
+
+
+def parseMonth(monthText):
+    if monthText.isdigit():
+        month = int(monthText)
+    elif monthText.upper() in monthNames:
+        month = monthNames.index(monthText.upper()) + 1
+    else:
+        return None
+    return month if 1 <= month <= 12 else None
+
+
+def fullYear(yearText):
+    return int(yearText) + 2000 if len(yearText) == 2 else int(yearText)
+
+
+def statementMonths(statementPeriod):
+    """
+    Returns the (year, month) of each date in the statement period text, such
+    as "01 Dec 2018 to 31 Jan 2019", in order.
+    """
+    months = []
+    for match in periodDate.finditer(statementPeriod):
+        month = parseMonth(match.group(1) or match.group(2))
+        if month is not None:
+            months.append((fullYear(match.group(3)), month))
+    return months
+
+
+def transactionMonth(date, statementPeriod=None):
+    """
+    Returns "YYYY-MM" for the given statement date text, or None if the
+    format isn't recognised. Dates without a year take it from the statement
+    period, if given.
+    """
+    date = date.strip()
+    match = numericDate.match(date) or namedDate.match(date)
+    if not match:
+        return None
+    month = parseMonth(match.group(1))
+    if month is None:
+        return None
+
+    if match.group(2) is not None:
+        return "{}-{:02}".format(fullYear(match.group(2)), month)
+
+    months = statementMonths(statementPeriod) if statementPeriod else []
+    if not months:
+        return None
+    start, end = months[0], months[-1]
+    for year in range(start[0], end[0] + 1):
+        if start <= (year, month) <= end:
+            return "{}-{:02}".format(year, month)
+    return None
+
+
+def parseForeignValue(foreignValue):
+    """
+    Returns (currency, hundredths) from a foreignValue such as "USD 12.34",
+    or None if it can't be parsed.
+    """
+    match = foreignAmount.match(foreignValue)
+    if not match or match.group(1) not in knownForeignCurrencies:
+        return None
+    amount = match.group(2)
+    if "." not in amount:
+        amount += ".00"
+    dollarStr, _, centStr = amount.partition(".")
+    return match.group(1), currencyToCents("{}.{:0<2}".format(dollarStr,
+                                                              centStr[:2]))
+
+
+class Rollup(object):
+    def __init__(self, count=0, total=0, foreignTotals=None):
+        self.count = count
+        self.total = total
+        # Currency code -> hundredths of that currency
+        self.foreignTotals = foreignTotals if foreignTotals is not None else {}
+
+    def add(self, value, foreign):
+        self.count += 1
+        self.total += value
+        if foreign is not None:
+            currency, amount = foreign
+            self.foreignTotals[currency] = self.foreignTotals.get(currency,
+                                                                  0) + amount
+
+    def __repr__(self):
+        return "{}: {} transactions, {}{}".format(
+            self.__class__.__name__, self.count, centsToCurrency(self.total),
+            "".join(" ({} {:.2f})".format(currency, float(amount) / 100)
+                    for currency, amount in sorted(self.foreignTotals.items())))
+
+
+class Rollups(object):
+    dimensions = ("month", "type", "detail", "location", "monthType")
+
+    def __init__(self):
+        self.statements = set()
+        self.rollups = dict((dimension, {}) for dimension in self.dimensions)
+
+    def transactionKeys(self, transaction, statementPeriod=None):
+        month = transactionMonth(transaction.date,
+                                 statementPeriod) or "unknown"
+        transactionType = transaction.__class__.__name__
+        keys = [("month", month), ("type", transactionType),
+                ("monthType", "{} {}".format(month, transactionType))]
+        if transaction.detail is not None:
+            keys.append(("detail", transaction.detail))
+        if getattr(transaction, "location", None) is not None:
+            keys.append(("location", transaction.location))
+        return keys
+
+    def transactionUpdate(self, transaction, statementPeriod=None):
+        """
+        Returns (keys, value, foreign) describing how the transaction changes
+        the rollups, without changing them.
+        """
+        foreignValue = getattr(transaction, "foreignValue", None)
+        foreign = parseForeignValue(
+            foreignValue) if foreignValue is not None else None
+        return (self.transactionKeys(transaction, statementPeriod),
+                transaction.value, foreign)
+
+    def applyUpdate(self, keys, value, foreign):
+        for dimension, key in keys:
+            rollup = self.rollups[dimension].get(key)
+            if rollup is None:
+                rollup = self.rollups[dimension][key] = Rollup()
+            rollup.add(value, foreign)
+
+    def addTransaction(self, transaction, statementPeriod=None):
+        self.applyUpdate(*self.transactionUpdate(transaction, statementPeriod))
+
+    def addStatement(self, filename):
+        """
+        Parses and adds a statement's transactions. Returns False without
+        doing anything if the same statement has already been ingested, even
+        from a different download of it.
+
+        Either all of the statement's transactions are added, or none are.
+        """
+        resetParseState()
+        statementPeriod, transactions = getStatement(filename)
+
+        # Keyed on what was parsed rather than the file, as the bank's PDFs
+        # differ in metadata each time they're downloaded.
+        statement = hashlib.sha256(json.dumps(
+            [statementPeriod,
+             [canonicalTransaction(t) for t in transactions]],
+            sort_keys=True).encode("utf-8")).hexdigest()
+        if statement in self.statements:
+            return False
+
+        updates = [self.transactionUpdate(t, statementPeriod)
+                   for t in transactions]
+        for update in updates:
+            self.applyUpdate(*update)
+        self.statements.add(statement)
+        return True
+
+    def get(self, dimension, *key):
+        """
+        Looks up a single rollup, e.g. get("month", "2019-01") or
+        get("monthType", "2019-01", "VisaPurchase").
+        """
+        return self.rollups[dimension].get(" ".join(key), Rollup())
+
+    def keys(self, dimension):
+        return sorted(self.rollups[dimension].keys())
+
+    def save(self, filename):
+        data = {
+            "statements": sorted(self.statements),
+            "rollups": dict(
+                (dimension, dict((key, [r.count, r.total, r.foreignTotals])
+                                 for key, r in rollups.items()))
+                for dimension, rollups in self.rollups.items()),
+        }
+        # Write a new file and swap it in, so an interrupted save can't
+        # truncate the existing rollups.
+        fd, tempName = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as rollupFile:
+                json.dump(data, rollupFile, separators=(",", ":"),
+                          sort_keys=True)
+            os.replace(tempName, filename)
+        except BaseException:
+            os.unlink(tempName)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        rollups = cls()
+        with open(filename) as rollupFile:
+            data = json.load(rollupFile)
+        rollups.statements = set(data["statements"])
+        for dimension, entries in data["rollups"].items():
+            rollups.rollups[dimension] = dict(
+                (key, Rollup(*entry)) for key, entry in entries.items())
+        return rollups
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("rollups", help="rollup JSON file, created when a "
+                        "statement is first added")
+    parser.add_argument("statement", nargs="*",
+                        help="statements to add to the rollups")
+    parser.add_argument("--show", choices=Rollups.dimensions, default="month",
+                        help="dimension to print (default: month)")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.rollups):
+        rollups = Rollups.load(args.rollups)
+    else:
+        rollups = Rollups()
+
+    failed = False
+    for statement in args.statement:
+        try:
+            added = rollups.addStatement(statement)
+        except Exception as e:
+            print("{}: {}: {}".format(statement, e.__class__.__name__, e),
+                  file=sys.stderr)
+            failed = True
+            continue
+        # Save as we go, so a later failure doesn't lose earlier statements
+        if added:
+            rollups.save(args.rollups)
+
+    print(("\n".join(["{}: {}".format(key, rollups.get(args.show, key))
+                      for key in rollups.keys(args.show)])))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from StGeorgeStatement.corpus import (compareRuns, describeOutputDiff,
+                                      findStatements, main, parseStatement)
+
+credit = {"type": "Credit", "date": "01/01/19", "detail": "PAY",
+          "note": None, "value": 100, "balance": 100}
+
+
+def run(wallSeconds=1.0, jobs=2, **files):
+    return {
+        "files": dict((name, {"output": output, "seconds": seconds})
+                      for name, (output, seconds) in files.items()),
+        "wallSeconds": wallSeconds,
+        "jobs": jobs,
+    }
+
+
+def test_find_statements(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("b.pdf", "sub/a.PDF", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert findStatements(str(tmp_path)) == ["b.pdf", "sub/a.PDF"]
+
+
+def test_identical_runs_pass():
+    baseline = run(a=([credit], 1.0))
+    assert compareRuns(baseline, run(a=([credit], 1.0)), 0.2, 0.05) == []
+
+
+def test_output_diff():
+    changed = dict(credit, value=200)
+    problems = compareRuns(run(a=([credit], 1.0)), run(a=([changed], 1.0)),
+                           0.2, 0.05)
+    assert len(problems) == 1
+    assert problems[0].startswith("Output changed: a")
+    assert '-{"balance": 100, "date"' in problems[0]
+
+
+def test_failure_output_diff():
+    diff = describeOutputDiff("a", [credit], "AssertionError: oops")
+    assert "--- baseline/a" in diff
+    assert "+++ current/a" in diff
+    assert "+AssertionError: oops" in diff
+
+
+def test_added_and_missing_files():
+    problems = compareRuns(run(a=([], 1.0)), run(b=([], 1.0)), 0.2, 0.05)
+    assert problems == ["Missing from corpus: a", "Not in baseline: b"]
+
+
+def test_tolerance_boundary():
+    baseline = run(a=([], 1.0))
+    assert compareRuns(baseline, run(a=([], 1.5)), 0.5, 0.05) == []
+    problems = compareRuns(baseline, run(a=([], 1.51)), 0.5, 0.05)
+    assert [p.split(":")[0] for p in problems] == ["Latency regression",
+                                                   "Throughput regression"]
+
+
+def test_noise_floor():
+    baseline = run(wallSeconds=0.001, a=([], 0.001))
+    current = run(wallSeconds=0.004, a=([], 0.004))
+    assert compareRuns(baseline, current, 0.2, 0.05) == []
+    assert len(compareRuns(baseline, current, 0.2, 0.0)) == 3
+
+
+def test_wall_clock_throughput():
+    baseline = run(wallSeconds=1.0, a=([], 1.0), b=([], 1.0))
+    # Same per-file times, but the parallel run got slower
+    problems = compareRuns(baseline, run(wallSeconds=2.0, a=([], 1.0),
+                                         b=([], 1.0)), 0.2, 0.05)
+    assert problems == ["Throughput regression: 2.00 -> 1.00 statements/s"]
+    # Twice the statements in twice the time is the same throughput
+    problems = compareRuns(
+        baseline, run(wallSeconds=2.0, a=([], 1.0), b=([], 1.0), c=([], 1.0),
+                      d=([], 1.0)), 0.2, 0.05)
+    assert problems == ["Not in baseline: c", "Not in baseline: d"]
+
+
+def test_wall_clock_throughput_needs_same_jobs():
+    baseline = run(wallSeconds=1.0, jobs=2, a=([], 1.0), b=([], 1.0))
+    current = run(wallSeconds=2.0, jobs=1, a=([], 1.0), b=([], 1.0))
+    assert compareRuns(baseline, current, 0.2, 0.05) == []
+
+
+def test_parse_failure_is_output(tmp_path):
+    junk = tmp_path / "junk.pdf"
+    junk.write_bytes(b"not a pdf")
+    output, seconds = parseStatement(str(junk), repeat=3)
+    assert isinstance(output, str)
+    assert seconds >= 0
+
+
+@pytest.fixture
+def junkCorpus(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (corpus / name).write_bytes(b"not a pdf")
+    return str(corpus), str(tmp_path / "baseline.json")
+
+
+def test_main_missing_baseline(junkCorpus):
+    corpus, baseline = junkCorpus
+    assert main([corpus, baseline]) == 2
+
+
+def test_main_missing_corpus(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    assert main([str(tmp_path / "nowhere"), baseline, "--update"]) == 2
+    assert main([str(tmp_path), baseline, "--update"]) == 2
+
+
+def test_main_update_refuses_failures(junkCorpus):
+    corpus, baseline = junkCorpus
+    assert main([corpus, baseline, "--update", "--jobs", "1"]) == 2
+
+
+def test_main_gate(junkCorpus):
+    corpus, baseline = junkCorpus
+    args = [corpus, baseline, "--jobs", "1", "--min-seconds", "60"]
+    assert main(args + ["--update", "--allow-failures"]) == 0
+    assert main(args) == 0
+
+    with open(baseline) as baselineFile:
+        recorded = json.load(baselineFile)
+    recorded["files"]["a.pdf"]["output"] = []
+    with open(baseline, "w") as baselineFile:
+        json.dump(recorded, baselineFile)
+    assert main(args) == 1
+
+
+def test_main_rejects_zero_jobs(junkCorpus):
+    corpus, baseline = junkCorpus
+    with pytest.raises(SystemExit):
+        main([corpus, baseline, "--jobs", "0"])
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+import StGeorgeStatement.rollups as rollupsModule
+from StGeorgeStatement.rollups import (Rollups, parseForeignValue,
+                                       transactionMonth)
+from StGeorgeStatement.statement import addTransaction
+
+
+def test_transaction_month():
+    assert transactionMonth("02/01/2019") == "2019-01"
+    assert transactionMonth("2/1/19") == "2019-01"
+    assert transactionMonth("03 Jul 2019") == "2019-07"
+    assert transactionMonth("03 JULY 19") == "2019-07"
+    assert transactionMonth("1/13/19") is None
+    assert transactionMonth("03 XYZ 19") is None
+    assert transactionMonth("OPENING") is None
+
+
+def test_transaction_month_from_statement_period():
+    assert transactionMonth("03 JUL") is None
+    assert transactionMonth("03 JUL", "01 Jul 2019 to 31 Jul 2019") == "2019-07"
+    period = "01 Dec 2018 to 31 Jan 2019"
+    assert transactionMonth("15 DEC", period) == "2018-12"
+    assert transactionMonth("15/01", period) == "2019-01"
+    assert transactionMonth("15 JUN", period) is None
+    assert transactionMonth("15 JUN", "no dates here") is None
+
+
+def test_parse_foreign_value():
+    assert parseForeignValue("USD 12.34") == ("USD", 1234)
+    assert parseForeignValue("VND 100,000") == ("VND", 10000000)
+    assert parseForeignValue("USD12.3") == ("USD", 1230)
+    assert parseForeignValue("USD ,") is None
+    assert parseForeignValue("AUD 1.00") is None
+    assert parseForeignValue("SHOP") is None
+
+
+def sampleRollups():
+    rollups = Rollups()
+    visa = addTransaction("02/01/2019", "VISA PURCHASE O/SEAS", -1000, 0)
+    visa.addDetail("USD 7.50")
+    visa.addDetail("SHOP")
+    rollups.addTransaction(visa)
+    eftpos = addTransaction("03 JAN", "EFTPOS PURCHASE", -500, 0)
+    eftpos.addDetail("SYDNEY")
+    rollups.addTransaction(eftpos, "01 Jan 2019 to 31 Jan 2019")
+    return rollups
+
+
+def test_add_transaction_keys():
+    rollups = sampleRollups()
+    month = rollups.get("month", "2019-01")
+    assert (month.count, month.total, month.foreignTotals) == (2, -1500,
+                                                               {"USD": 750})
+    assert rollups.keys("type") == ["EftPosPurchase", "VisaPurchaseForeign"]
+    assert rollups.get("monthType", "2019-01", "VisaPurchaseForeign").total == -1000
+    assert rollups.keys("detail") == ["EFTPOS PURCHASE", "SHOP"]
+    assert rollups.keys("location") == ["SYDNEY"]
+    assert rollups.get("location", "SYDNEY").foreignTotals == {}
+    assert rollups.get("month", "2018-01").count == 0
+
+
+def test_save_load_round_trip(tmp_path):
+    rollups = sampleRollups()
+    rollups.statements.add("0" * 64)
+    filename = str(tmp_path / "rollups.json")
+    rollups.save(filename)
+    assert os.listdir(str(tmp_path)) == ["rollups.json"]
+
+    loaded = Rollups.load(filename)
+    assert loaded.statements == rollups.statements
+    for dimension in Rollups.dimensions:
+        assert loaded.keys(dimension) == rollups.keys(dimension)
+        for key in rollups.keys(dimension):
+            expected = rollups.get(dimension, key)
+            actual = loaded.get(dimension, key)
+            assert (actual.count, actual.total, actual.foreignTotals) == (
+                expected.count, expected.total, expected.foreignTotals)
+
+
+def statementReader(statements):
+    """
+    Stands in for getStatement, returning canned statements by filename.
+    """
+    def getStatement(filename):
+        period, transactions = statements[os.path.basename(filename)]
+        return period, transactions()
+    return getStatement
+
+
+def purchase(date, value):
+    eftpos = addTransaction(date, "EFTPOS PURCHASE", value, 0)
+    eftpos.addDetail("SYDNEY")
+    return eftpos
+
+
+def test_add_statement_skips_same_statement(tmp_path, monkeypatch):
+    period = "01 Jan 2019 to 31 Jan 2019"
+    monkeypatch.setattr(
+        rollupsModule, "getStatement",
+        statementReader({
+            "statement.pdf": (period, lambda: [purchase("03 JAN", -500)]),
+            "redownload.pdf": (period, lambda: [purchase("03 JAN", -500)]),
+            "another.pdf": (period, lambda: [purchase("04 JAN", -500)]),
+        }))
+
+    rollups = Rollups()
+    assert rollups.addStatement(str(tmp_path / "statement.pdf")) is True
+    assert rollups.addStatement(str(tmp_path / "redownload.pdf")) is False
+    assert rollups.addStatement(str(tmp_path / "another.pdf")) is True
+    assert rollups.get("month", "2019-01").count == 2
+
+
+def test_failed_add_statement_changes_nothing(tmp_path, monkeypatch):
+    def transactions():
+        # The second transaction's date can't be examined
+        return [purchase("03 JAN", -500), purchase(None, -500)]
+
+    monkeypatch.setattr(
+        rollupsModule, "getStatement",
+        statementReader({
+            "bad.pdf": ("01 Jan 2019 to 31 Jan 2019", transactions)}))
+
+    rollups = Rollups()
+    for _ in range(2):
+        with pytest.raises(AttributeError):
+            rollups.addStatement(str(tmp_path / "bad.pdf"))
+    assert rollups.statements == set()
+    for dimension in Rollups.dimensions:
+        assert rollups.keys(dimension) == []
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+repoRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative microseconds allowed for "import StGeorgeStatement". Currently a
+# few milliseconds; pulling PyPDF2 back in at import time costs far more.
+importBudgetMicroseconds = 50000
+
+
+def importTimes():
+    """
+    Returns {module: cumulative microseconds} from python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import StGeorgeStatement"],
+        cwd=repoRoot, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_does_not_load_pypdf2():
+    loaded = [m for m in importTimes() if m.split(".")[0] == "PyPDF2"]
+    assert loaded == []
+
+
+def test_import_within_budget():
+    times = importTimes()
+    assert times["StGeorgeStatement"] < importBudgetMicroseconds, times